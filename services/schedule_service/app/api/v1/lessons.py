@@ -161,10 +161,10 @@ async def update_lesson(
     Можно изменить: кабинет, время, статус, заметки
     """
     
-    lesson = await lesson_service.get_lesson(lesson_id)
+    teacher_id = await lesson_service.get_lesson_teacher_id(lesson_id)
     
     # Проверяем доступ
-    if not check_teacher_access(current_user, lesson.teacher_id):
+    if not check_teacher_access(current_user, teacher_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this lesson"
@@ -199,10 +199,10 @@ async def cancel_lesson(
 ):
     """Отменить занятие"""
     
-    lesson = await lesson_service.get_lesson(lesson_id)
+    teacher_id = await lesson_service.get_lesson_teacher_id(lesson_id)
     
     # Проверяем доступ
-    if not check_teacher_access(current_user, lesson.teacher_id):
+    if not check_teacher_access(current_user, teacher_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="У вас нет доступа к этому занятию"
@@ -211,11 +211,10 @@ async def cancel_lesson(
     reason = data.reason if data else None
     cancelled_lesson = await lesson_service.cancel_lesson(lesson_id, reason)
     
-    # Формируем ответ
-    student_ids = await lesson_service.get_lesson_student_ids(lesson_id)
+    # Формируем ответ: ученики уже загружены вместе с занятием
     students = [
-        LessonStudentInfo(student_id=sid, attendance_status="cancelled")
-        for sid in student_ids
+        LessonStudentInfo(student_id=student.student_id, attendance_status="cancelled")
+        for student in cancelled_lesson.students
     ]
     
     response = LessonResponse.model_validate(cancelled_lesson)
@@ -237,10 +236,10 @@ async def complete_lesson(
 ):
     """Отметить занятие как завершенное"""
     
-    lesson = await lesson_service.get_lesson(lesson_id)
+    teacher_id = await lesson_service.get_lesson_teacher_id(lesson_id)
     
     # Проверяем доступ
-    if not check_teacher_access(current_user, lesson.teacher_id):
+    if not check_teacher_access(current_user, teacher_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this lesson"
@@ -248,11 +247,10 @@ async def complete_lesson(
     
     completed_lesson = await lesson_service.complete_lesson(lesson_id)
     
-    # Формируем ответ
-    student_ids = await lesson_service.get_lesson_student_ids(lesson_id)
+    # Формируем ответ: ученики уже загружены вместе с занятием
     students = [
-        LessonStudentInfo(student_id=sid, attendance_status="attended")
-        for sid in student_ids
+        LessonStudentInfo(student_id=student.student_id, attendance_status="attended")
+        for student in completed_lesson.students
     ]
     
     response = LessonResponse.model_validate(completed_lesson)
@@ -274,10 +272,10 @@ async def mark_lesson_missed(
 ):
     """Отметить занятие как пропущенное учеником"""
     
-    lesson = await lesson_service.get_lesson(lesson_id)
+    teacher_id = await lesson_service.get_lesson_teacher_id(lesson_id)
     
     # Проверяем доступ
-    if not check_teacher_access(current_user, lesson.teacher_id):
+    if not check_teacher_access(current_user, teacher_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this lesson"
@@ -285,11 +283,10 @@ async def mark_lesson_missed(
     
     missed_lesson = await lesson_service.mark_as_missed(lesson_id)
     
-    # Формируем ответ
-    student_ids = await lesson_service.get_lesson_student_ids(lesson_id)
+    # Формируем ответ: ученики уже загружены вместе с занятием
     students = [
-        LessonStudentInfo(student_id=sid, attendance_status="missed")
-        for sid in student_ids
+        LessonStudentInfo(student_id=student.student_id, attendance_status="missed")
+        for student in missed_lesson.students
     ]
     
     response = LessonResponse.model_validate(missed_lesson)
@@ -311,10 +308,10 @@ async def delete_lesson(
 ):
     """Удалить занятие"""
     
-    lesson = await lesson_service.get_lesson(lesson_id)
+    teacher_id = await lesson_service.get_lesson_teacher_id(lesson_id)
     
     # Проверяем доступ
-    if not check_teacher_access(current_user, lesson.teacher_id):
+    if not check_teacher_access(current_user, teacher_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You don't have access to this lesson"
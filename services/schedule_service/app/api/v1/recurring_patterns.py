@@ -110,15 +110,16 @@ async def get_recurring_patterns(
             detail="У вас нет доступа к шаблонам!"
         )
     
-    # Обогащаем данные
+    # Обогащаем данные: ученики и счётчики занятий всех шаблонов - двумя запросами
+    pattern_ids = [pattern.id for pattern in patterns]
+    student_ids_by_pattern = await pattern_service.get_patterns_student_ids(pattern_ids)
+    generated_counts = await pattern_service.count_generated_lessons_bulk(pattern_ids)
+    
     response_patterns = []
     for pattern in patterns:
-        student_ids = await pattern_service.get_pattern_student_ids(pattern.id)
-        generated_count = await pattern_service.count_generated_lessons(pattern.id)
-        
         pattern_response = RecurringPatternResponse.model_validate(pattern)
-        pattern_response.student_ids = student_ids
-        pattern_response.generated_lessons_count = generated_count
+        pattern_response.student_ids = student_ids_by_pattern.get(pattern.id, [])
+        pattern_response.generated_lessons_count = generated_counts.get(pattern.id, 0)
         
         response_patterns.append(pattern_response)
     
@@ -149,7 +150,8 @@ async def get_recurring_pattern(
             detail="У вас нет доступа к этому шаблону!"
         )
     
-    student_ids = await pattern_service.get_pattern_student_ids(pattern.id)
+    # Ученики уже загружены вместе с шаблоном
+    student_ids = [student.student_id for student in pattern.students]
     generated_count = await pattern_service.count_generated_lessons(pattern.id)
     
     response = RecurringPatternResponse.model_validate(pattern)
@@ -176,10 +178,10 @@ async def update_recurring_pattern(
     Примечание: Уже созданные занятия не изменяются
     """
     
-    pattern = await pattern_service.get_pattern(pattern_id)
+    teacher_id = await pattern_service.get_pattern_teacher_id(pattern_id)
     
     # Проверяем доступ
-    if not check_teacher_access(current_user, pattern.teacher_id):
+    if not check_teacher_access(current_user, teacher_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="У вас нет доступа к этому шаблону!"
@@ -213,10 +215,10 @@ async def delete_recurring_pattern(
     Уже созданные занятия остаются (recurring_pattern_id становится NULL)
     """
     
-    pattern = await pattern_service.get_pattern(pattern_id)
+    teacher_id = await pattern_service.get_pattern_teacher_id(pattern_id)
     
     # Проверяем доступ
-    if not check_teacher_access(current_user, pattern.teacher_id):
+    if not check_teacher_access(current_user, teacher_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="У вас нет доступа к этому шаблону!"
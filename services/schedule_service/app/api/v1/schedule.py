@@ -36,6 +36,26 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/schedule", tags=["Schedule"])
 
 
+def _validate_date_range(from_date: date, to_date: date) -> None:
+    """
+    Проверить период запроса расписания
+    
+    Период ограничен schedule_max_range_days, чтобы один запрос не
+    выгружал расписание за годы.
+    """
+    if to_date < from_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="to_date must not be earlier than from_date"
+        )
+    
+    if (to_date - from_date).days > settings.schedule_max_range_days:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must not exceed {settings.schedule_max_range_days} days"
+        )
+
+
 @router.get(
     "/studios/{studio_id}",
     response_model=StudioScheduleResponse,
@@ -60,6 +80,8 @@ async def get_studio_schedule(
             detail="You don't have access to this studio"
         )
     
+    _validate_date_range(from_date, to_date)
+    
     # Получаем расписание
     lessons = await schedule_service.get_studio_schedule(studio_id, from_date, to_date)
     
@@ -100,6 +122,8 @@ async def get_teacher_schedule(
             detail="You don't have access to this teacher's schedule"
         )
     
+    _validate_date_range(from_date, to_date)
+    
     # Получаем расписание
     lessons = await schedule_service.get_teacher_schedule(teacher_id, from_date, to_date)
     
@@ -140,6 +164,8 @@ async def get_student_schedule(
             detail="You don't have access to this student's schedule"
         )
     
+    _validate_date_range(from_date, to_date)
+    
     # Получаем расписание
     lessons = await schedule_service.get_student_schedule(student_id, from_date, to_date)
     
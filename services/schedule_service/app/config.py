@@ -64,6 +64,10 @@ class Settings(BaseSettings):
     
     # ===== SCHEDULE SETTINGS =====
     schedule_generation_weeks: int = Field(2, env="SCHEDULE_GENERATION_WEEKS")
+    schedule_generation_concurrency: int = Field(5, env="SCHEDULE_GENERATION_CONCURRENCY")
+    schedule_generation_check_ttl: int = Field(60, env="SCHEDULE_GENERATION_CHECK_TTL")
+    schedule_cache_ttl: int = Field(60, env="SCHEDULE_CACHE_TTL")
+    schedule_max_range_days: int = Field(90, env="SCHEDULE_MAX_RANGE_DAYS")
     default_lesson_duration_minutes: int = Field(60, env="DEFAULT_LESSON_DURATION_MINUTES")
     schedule_timezone: str = Field("Asia/Tomsk", env="SCHEDULE_TIMEZONE")
     working_hours_start: str = Field("09:00", env="WORKING_HOURS_START")
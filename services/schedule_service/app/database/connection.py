@@ -16,17 +16,24 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy import text
 
 from app.config import settings
+from app.database.schedule_cache import (
+    invalidate_changed_schedules,
+    discard_schedule_changes,
+)
 
 logger = logging.getLogger(__name__)
 
 
 # ==================== SCHEDULE SERVICE DATABASE ====================
 
+# Постоянные соединения пула (сверх них - до max_overflow временных)
+POOL_SIZE = 10
+
 schedule_engine = create_async_engine(
     settings.database_url_async,
     echo=settings.debug,
     pool_pre_ping=True,
-    pool_size=10,
+    pool_size=POOL_SIZE,
     max_overflow=20,
 )
 
@@ -47,7 +54,10 @@ async def get_schedule_db() -> AsyncGenerator[AsyncSession, None]:
         try:
             yield session
             await session.commit()
+            # Кэш расписаний сбрасываем только после фиксации изменений
+            await invalidate_changed_schedules(session)
         except Exception as e:
+            discard_schedule_changes(session)
             await session.rollback()
             logger.error(f"Database session error: {e}")
             raise
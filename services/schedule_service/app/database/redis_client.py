@@ -11,6 +11,9 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Размер пачки для SCAN (COUNT) и UNLINK при удалении по паттерну
+SCAN_BATCH_SIZE = 500
+
 
 class RedisClient:
     """Redis client для кэширования расписаний"""
@@ -78,19 +81,40 @@ class RedisClient:
             logger.error(f"Redis delete error for key {key}: {e}")
             return False
     
+    async def incr(self, key: str) -> Optional[int]:
+        """Увеличить счётчик на 1 (ключ без TTL)"""
+        if not self.redis:
+            return None
+        
+        try:
+            return await self.redis.incr(key)
+        except Exception as e:
+            logger.error(f"Redis incr error for key {key}: {e}")
+            return None
+    
     async def delete_pattern(self, pattern: str) -> int:
-        """Удалить все ключи по паттерну"""
+        """
+        Удалить все ключи по паттерну
+        
+        Ключи ищутся через SCAN (не блокирует Redis, в отличие от KEYS) и
+        удаляются пачками по SCAN_BATCH_SIZE через UNLINK - память
+        освобождается в фоновом потоке Redis.
+        """
         if not self.redis:
             return 0
         
         try:
-            keys = []
-            async for key in self.redis.scan_iter(match=pattern):
-                keys.append(key)
+            deleted = 0
+            batch = []
+            async for key in self.redis.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+                batch.append(key)
+                if len(batch) >= SCAN_BATCH_SIZE:
+                    deleted += await self.redis.unlink(*batch)
+                    batch = []
             
-            if keys:
-                return await self.redis.delete(*keys)
-            return 0
+            if batch:
+                deleted += await self.redis.unlink(*batch)
+            return deleted
         except Exception as e:
             logger.error(f"Redis delete pattern error for pattern {pattern}: {e}")
             return 0
@@ -0,0 +1,52 @@
+"""
+Сброс закэшированных расписаний после фиксации транзакции
+
+Изменения занятий видны другим запросам только после COMMIT. Если сбросить
+кэш раньше, параллельное чтение успеет закэшировать старые строки на
+schedule_cache_ttl. Поэтому сервисы лишь отмечают в сессии изменённые
+студии, а кэш сбрасывает тот, кто коммитит сессию.
+"""
+
+from typing import Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.redis_client import redis_client
+from app.utils.cache_keys import cache_keys
+
+# Ключ в session.info: {studio_id: нужно ли заново проверить генерацию}
+_CHANGED_STUDIOS_KEY = "schedule_changed_studios"
+
+
+def mark_schedule_changed(
+    session: AsyncSession,
+    studio_id: int,
+    regenerate: bool = False
+) -> None:
+    """
+    Отметить, что расписание студии изменилось в транзакции сессии
+    
+    Args:
+        session: Сессия, в которой сделаны изменения
+        studio_id: ID студии
+        regenerate: Сбросить и отметку о проверке генерации
+            (шаблон мог стать активным или продлиться)
+    """
+    changed: Dict[int, bool] = session.info.setdefault(_CHANGED_STUDIOS_KEY, {})
+    changed[studio_id] = changed.get(studio_id, False) or regenerate
+
+
+async def invalidate_changed_schedules(session: AsyncSession) -> None:
+    """Сбросить кэш студий, отмеченных в сессии (вызывать после COMMIT)"""
+    changed: Dict[int, bool] = session.info.pop(_CHANGED_STUDIOS_KEY, {})
+    for studio_id, regenerate in changed.items():
+        # O(1): новая версия делает недоступными все закэшированные периоды
+        # студии, без поиска их ключей
+        await redis_client.incr(cache_keys.studio_schedule_version(studio_id))
+        if regenerate:
+            await redis_client.delete(cache_keys.generation_checked(studio_id))
+
+
+def discard_schedule_changes(session: AsyncSession) -> None:
+    """Забыть отмеченные студии (транзакция откачена)"""
+    session.info.pop(_CHANGED_STUDIOS_KEY, None)
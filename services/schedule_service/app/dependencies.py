@@ -7,7 +7,7 @@ from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database.connection import get_schedule_db
+from app.database.connection import get_schedule_db, ScheduleAsyncSessionLocal
 from app.repositories.recurring_pattern_repository import RecurringPatternRepository
 from app.repositories.lesson_repository import LessonRepository
 from app.repositories.user_repository import UserRepository
@@ -59,7 +59,7 @@ async def get_generator_service(
     lesson_repo: LessonRepository = Depends(get_lesson_repository)
 ) -> LessonGeneratorService:
     """Get LessonGeneratorService"""
-    return LessonGeneratorService(pattern_repo, lesson_repo)
+    return LessonGeneratorService(pattern_repo, lesson_repo, ScheduleAsyncSessionLocal)
 
 
 async def get_pattern_service(
@@ -6,10 +6,12 @@ import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.config import settings
 from app.api.v1.router import api_router
 from app.database.redis_client import redis_client
+from app.services.admin_service_client import admin_service_client
 
 from app.messaging.auth_consumer import consumer as auth_consumer
 from app.messaging.admin_consumer import consumer as admin_consumer
@@ -70,6 +72,7 @@ async def lifespan(app: FastAPI):
     
     await admin_consumer.stop()
     await auth_consumer.stop()
+    await admin_service_client.close()
     await redis_client.disconnect()
 
 
@@ -80,7 +83,9 @@ app = FastAPI(
     description="Schedule Service для управления расписанием занятий",
     docs_url="/docs",
     redoc_url="/redoc",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson сериализует большие ответы расписаний заметно быстрее json
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -4,7 +4,7 @@
 
 from typing import Optional
 from datetime import date, time
-from sqlalchemy import String, Integer, Date, Time, ForeignKey, Text, Index
+from sqlalchemy import String, Integer, Date, Time, ForeignKey, Text, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -23,8 +23,16 @@ class Lesson(Base, TimestampMixin):
     __table_args__ = (
         Index('idx_studio_date', 'studio_id', 'lesson_date'),
         Index('idx_teacher_date', 'teacher_id', 'lesson_date'),
-        Index('idx_classroom_datetime', 'classroom_id', 'lesson_date', 'start_time'),
         Index('idx_status', 'status'),
+        # Частичный индекс для запросов по кабинету (проверка конфликтов):
+        # отменённые занятия в них не участвуют
+        Index(
+            'idx_lessons_classroom_date_time',
+            'classroom_id', 'lesson_date', 'start_time', 'end_time',
+            postgresql_where=text("status != 'cancelled'")
+        ),
+        # Занятия шаблона и дата последнего сгенерированного (MAX по шаблону)
+        Index('idx_lessons_pattern_date', 'recurring_pattern_id', 'lesson_date'),
     )
     
     # Основные поля
@@ -2,7 +2,7 @@
 Модели связей занятий и шаблонов с учениками
 """
 
-from sqlalchemy import Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy import Integer, String, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base, TimestampMixin
@@ -20,6 +20,8 @@ class LessonStudent(Base, TimestampMixin):
     __tablename__ = "lesson_students"
     __table_args__ = (
         UniqueConstraint('lesson_id', 'student_id', name='uq_lesson_student'),
+        # Расписание ученика: по student_id сразу получаем lesson_id без чтения таблицы
+        Index('idx_lesson_students_student_lesson', 'student_id', 'lesson_id'),
     )
     
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -30,10 +32,11 @@ class LessonStudent(Base, TimestampMixin):
         index=True
     )
     
+    # Отдельный индекс по student_id не нужен: его заменяет
+    # idx_lesson_students_student_lesson
     student_id: Mapped[int] = mapped_column(
         Integer,
-        nullable=False,
-        index=True
+        nullable=False
     )
     
     # Статус участия ученика
@@ -3,9 +3,9 @@ Repository для работы с Lessons
 """
 
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Set
 from datetime import date, time
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, insert, update, func, and_, or_, literal_column
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -15,6 +15,11 @@ from app.repositories.base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
 
+# Условие частичного индекса idx_lessons_classroom_date_time. Рендерится
+# литералом, а не bind-параметром: по generic plan подготовленного запроса
+# (asyncpg) Postgres не может доказать предикат частичного индекса
+NOT_CANCELLED = Lesson.status != literal_column("'cancelled'")
+
 
 class LessonRepository(BaseRepository[Lesson]):
     """Repository для Lessons"""
@@ -31,6 +36,56 @@ class LessonRepository(BaseRepository[Lesson]):
         )
         return result.scalar_one_or_none()
     
+    async def get_teacher_id(self, lesson_id: int) -> Optional[int]:
+        """
+        Получить преподавателя занятия без загрузки самого занятия
+        
+        Для проверки доступа: один SELECT по первичному ключу.
+        
+        Returns:
+            ID преподавателя или None, если занятие не найдено
+        """
+        result = await self.db.execute(
+            select(Lesson.teacher_id).where(Lesson.id == lesson_id)
+        )
+        return result.scalar_one_or_none()
+    
+    async def update_status(
+        self,
+        lesson_id: int,
+        status: str,
+        cancellation_reason: Optional[str] = None
+    ) -> Optional[Lesson]:
+        """
+        Сменить статус занятия одним UPDATE ... RETURNING
+        
+        Занятие, уже находящееся в этом статусе, не обновляется.
+        Ученики подгружаются сразу (selectinload): по ним строятся событие
+        lesson.cancelled и ответ API, повторно их не запрашивают. Объект в
+        сессии синхронизируется с новыми значениями.
+        
+        Returns:
+            Обновлённое занятие или None, если занятие не найдено
+            или уже в статусе status
+        """
+        values: Dict[str, Any] = {"status": status}
+        if cancellation_reason:
+            values["cancellation_reason"] = cancellation_reason
+        
+        result = await self.db.execute(
+            update(Lesson)
+            .where(
+                and_(
+                    Lesson.id == lesson_id,
+                    Lesson.status != status
+                )
+            )
+            .values(**values)
+            .returning(Lesson)
+            .options(selectinload(Lesson.students))
+        )
+        return result.scalar_one_or_none()
+    
     async def get_by_studio(
         self,
         studio_id: int,
@@ -102,7 +157,7 @@ class LessonRepository(BaseRepository[Lesson]):
             and_(
                 Lesson.classroom_id == classroom_id,
                 Lesson.lesson_date == lesson_date,
-                Lesson.status != "cancelled"
+                NOT_CANCELLED
             )
         )
         
@@ -135,6 +190,38 @@ class LessonRepository(BaseRepository[Lesson]):
         
         return False
     
+    async def find_classroom_conflicts(
+        self,
+        classroom_id: int,
+        dates: List[date],
+        start_time: time,
+        end_time: time
+    ) -> Set[date]:
+        """
+        Найти даты, на которые кабинет уже занят в указанный интервал
+        
+        Проверяет все даты одним запросом (вместо check_classroom_conflict
+        на каждую дату).
+        
+        Returns:
+            Множество дат с конфликтом
+        """
+        if not dates:
+            return set()
+        
+        result = await self.db.execute(
+            select(Lesson.lesson_date).distinct().where(
+                and_(
+                    Lesson.classroom_id == classroom_id,
+                    Lesson.lesson_date.in_(dates),
+                    Lesson.start_time < end_time,
+                    Lesson.end_time > start_time,
+                    NOT_CANCELLED
+                )
+            )
+        )
+        return set(result.scalars().all())
+    
     async def get_by_pattern(
         self,
         pattern_id: int,
@@ -162,6 +249,57 @@ class LessonRepository(BaseRepository[Lesson]):
         )
         return result.scalar_one_or_none()
     
+    async def get_last_dates_for_patterns(
+        self,
+        pattern_ids: List[int]
+    ) -> Dict[int, date]:
+        """
+        Получить дату последнего сгенерированного занятия для нескольких шаблонов
+        
+        Returns:
+            {pattern_id: max(lesson_date)}; шаблоны без занятий отсутствуют
+        """
+        if not pattern_ids:
+            return {}
+        
+        result = await self.db.execute(
+            select(Lesson.recurring_pattern_id, func.max(Lesson.lesson_date))
+            .where(Lesson.recurring_pattern_id.in_(pattern_ids))
+            .group_by(Lesson.recurring_pattern_id)
+        )
+        return {pattern_id: last_date for pattern_id, last_date in result.all()}
+    
+    async def bulk_create(self, rows: List[Dict[str, Any]]) -> List[int]:
+        """
+        Создать несколько занятий одним INSERT ... RETURNING id
+        
+        Args:
+            rows: Список dict-ов с полями Lesson
+            
+        Returns:
+            ID созданных занятий в том же порядке, что и rows
+        """
+        if not rows:
+            return []
+        
+        result = await self.db.execute(
+            insert(Lesson).returning(Lesson.id, sort_by_parameter_order=True),
+            rows
+        )
+        return list(result.scalars().all())
+    
+    async def bulk_add_students(self, rows: List[Dict[str, int]]) -> None:
+        """
+        Добавить учеников к занятиям одним INSERT
+        
+        Args:
+            rows: Список dict-ов вида {"lesson_id": ..., "student_id": ...}
+        """
+        if not rows:
+            return
+        
+        await self.db.execute(insert(LessonStudent), rows)
+    
     async def add_student(self, lesson_id: int, student_id: int) -> LessonStudent:
         """Добавить ученика к занятию"""
         lesson_student = LessonStudent(
@@ -172,6 +310,13 @@ class LessonRepository(BaseRepository[Lesson]):
         await self.db.flush()
         return lesson_student
     
+    async def add_students(self, lesson_id: int, student_ids: List[int]) -> None:
+        """Добавить нескольких учеников к занятию одним INSERT"""
+        await self.bulk_add_students([
+            {"lesson_id": lesson_id, "student_id": student_id}
+            for student_id in student_ids
+        ])
+    
     async def remove_student(self, lesson_id: int, student_id: int) -> bool:
         """Удалить ученика из занятия"""
         from sqlalchemy import delete
@@ -195,6 +340,30 @@ class LessonRepository(BaseRepository[Lesson]):
         )
         return list(result.scalars().all())
     
+    async def get_student_ids_bulk(
+        self,
+        lesson_ids: List[int]
+    ) -> Dict[int, List[int]]:
+        """
+        Получить ID учеников для нескольких занятий одним запросом
+        
+        Returns:
+            {lesson_id: [student_id, ...]}; занятия без учеников отсутствуют
+        """
+        if not lesson_ids:
+            return {}
+        
+        result = await self.db.execute(
+            select(LessonStudent.lesson_id, LessonStudent.student_id).where(
+                LessonStudent.lesson_id.in_(lesson_ids)
+            )
+        )
+        
+        student_ids_by_lesson: Dict[int, List[int]] = {}
+        for lesson_id, student_id in result.all():
+            student_ids_by_lesson.setdefault(lesson_id, []).append(student_id)
+        return student_ids_by_lesson
+    
     async def count_by_studio(
         self,
         studio_id: int,
@@ -214,3 +383,29 @@ class LessonRepository(BaseRepository[Lesson]):
             )
         )
         return result.scalar_one()
+    
+    async def count_by_pattern(self, pattern_id: int) -> int:
+        """Подсчитать количество занятий, сгенерированных из шаблона"""
+        result = await self.db.execute(
+            select(func.count(Lesson.id)).where(
+                Lesson.recurring_pattern_id == pattern_id
+            )
+        )
+        return result.scalar_one()
+    
+    async def count_by_patterns(self, pattern_ids: List[int]) -> Dict[int, int]:
+        """
+        Подсчитать количество сгенерированных занятий для нескольких шаблонов
+        
+        Returns:
+            {pattern_id: count}; шаблоны без занятий отсутствуют
+        """
+        if not pattern_ids:
+            return {}
+        
+        result = await self.db.execute(
+            select(Lesson.recurring_pattern_id, func.count(Lesson.id))
+            .where(Lesson.recurring_pattern_id.in_(pattern_ids))
+            .group_by(Lesson.recurring_pattern_id)
+        )
+        return {pattern_id: count for pattern_id, count in result.all()}
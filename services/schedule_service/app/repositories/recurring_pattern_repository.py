@@ -3,18 +3,22 @@ Repository для работы с Recurring Patterns
 """
 
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import date
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, insert, delete, func, and_, or_, true
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.models.lesson import Lesson
 from app.models.recurring_pattern import RecurringPattern
 from app.models.lesson_student import RecurringPatternStudent
 from app.repositories.base_repository import BaseRepository
 
 logger = logging.getLogger(__name__)
 
+# Пространство ключей advisory-блокировки генерации (первый ключ пары)
+GENERATION_LOCK_NAMESPACE = 4201
+
 
 class RecurringPatternRepository(BaseRepository[RecurringPattern]):
     """Repository для Recurring Patterns"""
@@ -31,6 +35,18 @@ class RecurringPatternRepository(BaseRepository[RecurringPattern]):
         )
         return result.scalar_one_or_none()
     
+    async def get_teacher_id(self, pattern_id: int) -> Optional[int]:
+        """
+        Получить преподавателя шаблона без загрузки самого шаблона
+        
+        Returns:
+            ID преподавателя или None, если шаблон не найден
+        """
+        result = await self.db.execute(
+            select(RecurringPattern.teacher_id).where(RecurringPattern.id == pattern_id)
+        )
+        return result.scalar_one_or_none()
+    
     async def get_by_studio(
         self,
         studio_id: int,
@@ -50,6 +66,53 @@ class RecurringPatternRepository(BaseRepository[RecurringPattern]):
         result = await self.db.execute(query)
         return list(result.scalars().all())
     
+    async def lock_studio_generation(self, studio_id: int) -> None:
+        """
+        Взять advisory-блокировку генерации занятий студии до конца транзакции
+        
+        Сериализует проверку и генерацию одной студии между воркерами:
+        следующий запрос увидит уже зафиксированные занятия.
+        """
+        await self.db.execute(
+            select(func.pg_advisory_xact_lock(GENERATION_LOCK_NAMESPACE, studio_id))
+        )
+    
+    async def get_patterns_needing_generation(
+        self,
+        studio_id: int,
+        target_date: date
+    ) -> List[Tuple[RecurringPattern, Optional[date]]]:
+        """
+        Получить активные шаблоны студии, для которых занятия сгенерированы
+        не до target_date, одним запросом
+        
+        Дата последнего занятия берётся коррелированным подзапросом по
+        каждому шаблону - это поиск по индексу idx_lessons_pattern_date,
+        а не агрегация всей таблицы lessons.
+        
+        Returns:
+            Список (шаблон, дата последнего занятия или None)
+        """
+        last_date = (
+            select(func.max(Lesson.lesson_date))
+            .where(Lesson.recurring_pattern_id == RecurringPattern.id)
+            .correlate(RecurringPattern)
+            .scalar_subquery()
+        )
+        
+        result = await self.db.execute(
+            select(RecurringPattern, last_date.label("last_date"))
+            .where(
+                and_(
+                    RecurringPattern.studio_id == studio_id,
+                    RecurringPattern.is_active == True,
+                    # Шаблон без занятий (NULL) тоже требует генерации
+                    func.coalesce(last_date < target_date, true())
+                )
+            )
+        )
+        return [(pattern, last_lesson_date) for pattern, last_lesson_date in result.all()]
+    
     async def get_by_teacher(
         self,
         teacher_id: int,
@@ -104,6 +167,19 @@ class RecurringPatternRepository(BaseRepository[RecurringPattern]):
         await self.db.flush()
         return pattern_student
     
+    async def add_students(self, pattern_id: int, student_ids: List[int]) -> None:
+        """Добавить нескольких учеников к шаблону одним INSERT"""
+        if not student_ids:
+            return
+        
+        await self.db.execute(
+            insert(RecurringPatternStudent),
+            [
+                {"recurring_pattern_id": pattern_id, "student_id": student_id}
+                for student_id in student_ids
+            ]
+        )
+    
     async def remove_student(self, pattern_id: int, student_id: int) -> bool:
         """Удалить ученика из шаблона"""
         from sqlalchemy import delete
@@ -127,6 +203,47 @@ class RecurringPatternRepository(BaseRepository[RecurringPattern]):
         )
         return list(result.scalars().all())
     
+    async def get_student_ids_by_patterns(
+        self,
+        pattern_ids: List[int]
+    ) -> Dict[int, List[int]]:
+        """
+        Получить ID учеников для нескольких шаблонов одним запросом
+        
+        Returns:
+            {pattern_id: [student_id, ...]}; шаблоны без учеников отсутствуют
+        """
+        if not pattern_ids:
+            return {}
+        
+        result = await self.db.execute(
+            select(
+                RecurringPatternStudent.recurring_pattern_id,
+                RecurringPatternStudent.student_id
+            ).where(
+                RecurringPatternStudent.recurring_pattern_id.in_(pattern_ids)
+            )
+        )
+        
+        student_ids_by_pattern: Dict[int, List[int]] = {}
+        for pattern_id, student_id in result.all():
+            student_ids_by_pattern.setdefault(pattern_id, []).append(student_id)
+        return student_ids_by_pattern
+    
+    async def delete_returning_studio_id(self, pattern_id: int) -> Optional[int]:
+        """
+        Удалить шаблон одним DELETE ... RETURNING
+        
+        Returns:
+            ID студии удалённого шаблона или None, если шаблона не было
+        """
+        result = await self.db.execute(
+            delete(RecurringPattern)
+            .where(RecurringPattern.id == pattern_id)
+            .returning(RecurringPattern.studio_id)
+        )
+        return result.scalar_one_or_none()
+    
     async def update_students(self, pattern_id: int, student_ids: List[int]) -> None:
         """
         Обновить список учеников шаблона
@@ -141,5 +258,4 @@ class RecurringPatternRepository(BaseRepository[RecurringPattern]):
         )
         
         # Добавляем новых
-        for student_id in student_ids:
-            await self.add_student(pattern_id, student_id)
+        await self.add_students(pattern_id, student_ids)
@@ -18,94 +18,65 @@ class AdminServiceClient:
         self.base_url = settings.admin_service_url
         self.timeout = settings.admin_service_timeout
         self.internal_api_key = settings.internal_api_key
+        self._client: Optional[httpx.AsyncClient] = None
     
-    async def get_studio(self, studio_id: int) -> Optional[Dict[str, Any]]:
-        """Получить информацию о студии"""
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Общий httpx-клиент с пулом keep-alive соединений.
+        
+        Создаётся лениво при первом запросе.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                headers={"X-Internal-API-Key": self.internal_api_key},
+            )
+        return self._client
+    
+    async def close(self) -> None:
+        """Закрыть пул соединений (вызывается при shutdown приложения)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    async def _get(self, path: str, what: str) -> Optional[Any]:
+        """
+        Выполнить GET к Admin Service.
+        
+        Returns:
+            Распарсенный JSON при 200, None при 404, ошибке HTTP или сети.
+        """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/api/v1/studios/{studio_id}",
-                    headers={
-                        "X-Internal-API-Key": self.internal_api_key
-                    }
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None
-                else:
-                    logger.error(f"Admin Service error: {response.status_code}")
-                    return None
-                    
+            response = await self._get_client().get(path)
+            
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code != 404:
+                logger.error(f"Admin Service error: {response.status_code}")
+            return None
+            
         except Exception as e:
-            logger.error(f"Failed to get studio from Admin Service: {e}")
+            logger.error(f"Failed to get {what} from Admin Service: {e}")
             return None
     
+    async def get_studio(self, studio_id: int) -> Optional[Dict[str, Any]]:
+        """Получить информацию о студии"""
+        return await self._get(f"/api/v1/studios/{studio_id}", "studio")
+    
     async def get_classroom(self, classroom_id: int) -> Optional[Dict[str, Any]]:
         """Получить информацию о кабинете"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/api/v1/classrooms/{classroom_id}",
-                    headers={
-                        "X-Internal-API-Key": self.internal_api_key
-                    }
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                elif response.status_code == 404:
-                    return None
-                else:
-                    logger.error(f"Admin Service error: {response.status_code}")
-                    return None
-                    
-        except Exception as e:
-            logger.error(f"Failed to get classroom from Admin Service: {e}")
-            return None
+        return await self._get(f"/api/v1/classrooms/{classroom_id}", "classroom")
     
     async def get_studios(self) -> list:
         """Получить список всех студий"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/api/v1/studios",
-                    headers={
-                        "X-Internal-API-Key": self.internal_api_key
-                    }
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Admin Service error: {response.status_code}")
-                    return []
-                    
-        except Exception as e:
-            logger.error(f"Failed to get studios from Admin Service: {e}")
-            return []
+        return await self._get("/api/v1/studios", "studios") or []
     
     async def get_studio_classrooms(self, studio_id: int) -> list:
         """Получить все кабинеты студии"""
-        try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.base_url}/api/v1/studios/{studio_id}/classrooms",
-                    headers={
-                        "X-Internal-API-Key": self.internal_api_key
-                    }
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Admin Service error: {response.status_code}")
-                    return []
-                    
-        except Exception as e:
-            logger.error(f"Failed to get classrooms from Admin Service: {e}")
-            return []
+        return await self._get(
+            f"/api/v1/studios/{studio_id}/classrooms", "classrooms"
+        ) or []
 
 
 # Глобальный экземпляр клиента
@@ -2,32 +2,49 @@
 Сервис генерации занятий из recurring patterns
 """
 
+import asyncio
 import logging
-from typing import List, Optional, Tuple
-from datetime import date, time, timedelta, datetime
-import pytz
+from typing import Dict, List, Optional, Tuple, Union
+from datetime import date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.models.recurring_pattern import RecurringPattern
-from app.models.lesson import Lesson
 from app.repositories.recurring_pattern_repository import RecurringPatternRepository
 from app.repositories.lesson_repository import LessonRepository
 from app.config import settings
+from app.utils.time_utils import calculate_end_time
+from app.database.connection import POOL_SIZE
+from app.database.schedule_cache import (
+    mark_schedule_changed,
+    invalidate_changed_schedules,
+)
 from app.core.exceptions import GenerationException
 
 logger = logging.getLogger(__name__)
 
+# Общий на процесс лимит параллельно генерируемых групп шаблонов: каждая
+# держит своё соединение, поэтому лимит не превышает половины пула, и
+# параллельные генерации не отнимают соединения у обычных запросов
+_generation_semaphore = asyncio.Semaphore(
+    max(1, min(settings.schedule_generation_concurrency, POOL_SIZE // 2))
+)
+
 
 class LessonGeneratorService:
     """Сервис для генерации занятий из шаблонов"""
     
+    __slots__ = ("pattern_repo", "lesson_repo", "session_factory")
+    
     def __init__(
         self,
         pattern_repo: RecurringPatternRepository,
-        lesson_repo: LessonRepository
+        lesson_repo: LessonRepository,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None
     ):
         self.pattern_repo = pattern_repo
         self.lesson_repo = lesson_repo
-        self.timezone = pytz.timezone(settings.schedule_timezone)
+        # Фабрика сессий для параллельной генерации по нескольким шаблонам
+        self.session_factory = session_factory
     
     async def generate_lessons_for_pattern(
         self,
@@ -41,6 +58,35 @@ class LessonGeneratorService:
             pattern: Шаблон повторения
             until_date: До какой даты генерировать
             
+        Returns:
+            Tuple[generated_count, skipped_count, errors]
+        """
+        # Находим последнее сгенерированное занятие
+        last_lesson = await self.lesson_repo.get_last_generated_lesson(pattern.id)
+        
+        return await self._generate_for_pattern(
+            pattern,
+            until_date,
+            last_date=last_lesson.lesson_date if last_lesson else None
+        )
+    
+    async def _generate_for_pattern(
+        self,
+        pattern: RecurringPattern,
+        until_date: date,
+        last_date: Optional[date],
+        student_ids: Optional[List[int]] = None
+    ) -> Tuple[int, int, List[str]]:
+        """
+        Генерация занятий для шаблона по уже известной дате последнего занятия
+        
+        Args:
+            pattern: Шаблон повторения
+            until_date: До какой даты генерировать
+            last_date: Дата последнего сгенерированного занятия (None - ещё не было)
+            student_ids: Ученики шаблона, если уже загружены
+                (иначе будут запрошены из БД)
+            
         Returns:
             Tuple[generated_count, skipped_count, errors]
         """
@@ -49,72 +95,75 @@ class LessonGeneratorService:
         errors = []
         
         try:
-            # Находим последнее сгенерированное занятие
-            last_lesson = await self.lesson_repo.get_last_generated_lesson(pattern.id)
+            candidate_dates = self._candidate_dates(pattern, until_date, last_date)
             
-            if last_lesson:
-                # Начинаем со следующей недели после последнего занятия
-                next_date = last_lesson.lesson_date + timedelta(days=7)
-            else:
-                # Первая генерация - начинаем с valid_from
-                next_date = pattern.valid_from
-                # Находим ближайший нужный день недели
-                while next_date.isoweekday() != pattern.day_of_week:
-                    next_date += timedelta(days=1)
+            # Вычисляем end_time (одинаковый для всех занятий шаблона)
+            end_time = calculate_end_time(
+                pattern.start_time,
+                pattern.duration_minutes
+            )
             
-            # Генерируем занятия
-            while next_date <= until_date:
-                # Проверяем, не вышли ли за пределы valid_until
-                if pattern.valid_until and next_date > pattern.valid_until:
-                    break
-                
-                # Вычисляем end_time
-                end_time = self._calculate_end_time(
-                    pattern.start_time,
-                    pattern.duration_minutes
-                )
-                
-                # Проверяем конфликт кабинета
-                if pattern.classroom_id:
-                    has_conflict = await self.lesson_repo.check_classroom_conflict(
-                        classroom_id=pattern.classroom_id,
-                        lesson_date=next_date,
-                        start_time=pattern.start_time,
-                        end_time=end_time
-                    )
-                    
-                    if has_conflict:
-                        error_msg = f"Conflict for {next_date} at {pattern.start_time} in classroom {pattern.classroom_id}"
-                        logger.warning(error_msg)
-                        errors.append(error_msg)
-                        skipped_count += 1
-                        next_date += timedelta(days=7)
-                        continue
-                
-                # Создаем занятие
-                lesson = Lesson(
-                    studio_id=pattern.studio_id,
-                    teacher_id=pattern.teacher_id,
+            # Без кабинета конфликтов быть не может - все даты идут в INSERT.
+            # С кабинетом конфликты проверяются сразу по всем датам одним запросом.
+            lesson_dates = candidate_dates
+            if pattern.classroom_id and candidate_dates:
+                conflict_dates = await self.lesson_repo.find_classroom_conflicts(
                     classroom_id=pattern.classroom_id,
-                    recurring_pattern_id=pattern.id,
-                    lesson_date=next_date,
+                    dates=candidate_dates,
                     start_time=pattern.start_time,
-                    end_time=end_time,
-                    status="scheduled"
+                    end_time=end_time
                 )
+                if conflict_dates:
+                    for lesson_date in sorted(conflict_dates):
+                        error_msg = f"Conflict for {lesson_date} at {pattern.start_time} in classroom {pattern.classroom_id}"
+                        logger.warning(error_msg)
+                        errors.append(error_msg)
+                    skipped_count = len(conflict_dates)
+                    lesson_dates = [
+                        lesson_date for lesson_date in candidate_dates
+                        if lesson_date not in conflict_dates
+                    ]
+            
+            # Собираем строки занятий, вставляем их одним запросом
+            lesson_rows = [
+                {
+                    "studio_id": pattern.studio_id,
+                    "teacher_id": pattern.teacher_id,
+                    "classroom_id": pattern.classroom_id,
+                    "recurring_pattern_id": pattern.id,
+                    "lesson_date": lesson_date,
+                    "start_time": pattern.start_time,
+                    "end_time": end_time,
+                    "status": "scheduled",
+                }
+                for lesson_date in lesson_dates
+            ]
+            
+            if lesson_rows:
+                # Создаем все занятия одним INSERT ... RETURNING id
+                lesson_ids = await self.lesson_repo.bulk_create(lesson_rows)
                 
-                await self.lesson_repo.create(lesson)
-                
-                # Копируем учеников из шаблона
-                student_ids = await self.pattern_repo.get_student_ids(pattern.id)
-                for student_id in student_ids:
-                    await self.lesson_repo.add_student(lesson.id, student_id)
-                
-                generated_count += 1
-                logger.info(f"Generated lesson for pattern {pattern.id} on {next_date}")
+                # Копируем учеников из шаблона: один INSERT на весь шаблон
+                if student_ids is None:
+                    student_ids = await self.pattern_repo.get_student_ids(pattern.id)
+                await self.lesson_repo.bulk_add_students([
+                    {"lesson_id": lesson_id, "student_id": student_id}
+                    for lesson_id in lesson_ids
+                    for student_id in student_ids
+                ])
                 
-                # Переходим к следующей неделе
-                next_date += timedelta(days=7)
+                generated_count = len(lesson_ids)
+                logger.info(f"Generated {generated_count} lessons for pattern {pattern.id}")
+                # Новые занятия должны появиться в расписании студии сразу
+                # после фиксации транзакции
+                mark_schedule_changed(self.lesson_repo.db, pattern.studio_id)
+                # Подробный лог по каждому занятию - только на DEBUG
+                if logger.isEnabledFor(logging.DEBUG):
+                    for row in lesson_rows:
+                        logger.debug(
+                            "Generated lesson for pattern %s on %s",
+                            pattern.id, row["lesson_date"]
+                        )
             
             return generated_count, skipped_count, errors
             
@@ -150,20 +199,19 @@ class LessonGeneratorService:
         
         logger.info(f"Generating lessons for {len(patterns)} patterns until {until_date}")
         
-        for pattern in patterns:
-            try:
-                generated, skipped, errors = await self.generate_lessons_for_pattern(
-                    pattern,
-                    until_date
-                )
-                total_generated += generated
-                total_skipped += skipped
-                all_errors.extend(errors)
-                
-            except Exception as e:
-                error_msg = f"Failed to generate for pattern {pattern.id}: {str(e)}"
+        results = await self._generate_concurrently(patterns, until_date)
+        
+        for pattern, result in zip(patterns, results):
+            if isinstance(result, BaseException):
+                error_msg = f"Failed to generate for pattern {pattern.id}: {str(result)}"
                 logger.error(error_msg)
                 all_errors.append(error_msg)
+                continue
+            
+            generated, skipped, errors = result
+            total_generated += generated
+            total_skipped += skipped
+            all_errors.extend(errors)
         
         logger.info(
             f"Generation complete: {total_generated} generated, "
@@ -176,36 +224,205 @@ class LessonGeneratorService:
         """
         Проверить нужно ли генерировать занятия для студии и сгенерировать
         
-        Вызывается при запросе расписания как fallback механизм
+        Вызывается при запросе расписания как fallback механизм. Держит
+        блокировку генерации студии до конца транзакции - вызывающий должен
+        зафиксировать её сразу после вызова.
         
         Returns:
             Tuple[generated_count, skipped_count]
         """
         target_date = date.today() + timedelta(weeks=settings.schedule_generation_weeks)
         
-        # Получаем активные шаблоны студии
-        patterns = await self.pattern_repo.get_by_studio(studio_id, active_only=True)
+        # До COMMIT вызывающего другие воркеры ждут здесь и затем видят
+        # уже сгенерированные занятия
+        await self.pattern_repo.lock_studio_generation(studio_id)
+        
+        # Одним запросом получаем только шаблоны, которым нужна генерация,
+        # вместе с датами их последних занятий
+        rows = await self.pattern_repo.get_patterns_needing_generation(
+            studio_id,
+            target_date
+        )
+        if not rows:
+            return 0, 0
+        
+        patterns_to_generate = [pattern for pattern, _ in rows]
+        last_dates = {
+            pattern.id: last_date
+            for pattern, last_date in rows
+            if last_date is not None
+        }
         
         total_generated = 0
         total_skipped = 0
         
-        for pattern in patterns:
-            # Проверяем последнее сгенерированное занятие
-            last_lesson = await self.lesson_repo.get_last_generated_lesson(pattern.id)
+        # Вызывается на чтении расписания: генерируем последовательно в сессии
+        # запроса, не занимая дополнительных соединений пула
+        student_ids_by_pattern = await self.pattern_repo.get_student_ids_by_patterns(
+            [pattern.id for pattern in patterns_to_generate]
+        )
+        results = await self._generate_sequentially(
+            patterns_to_generate,
+            target_date,
+            last_dates,
+            student_ids_by_pattern
+        )
+        
+        for pattern, result in zip(patterns_to_generate, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to generate for pattern {pattern.id}: {result}")
+                continue
             
-            if not last_lesson or last_lesson.lesson_date < target_date:
-                # Нужна генерация
-                generated, skipped, _ = await self.generate_lessons_for_pattern(
-                    pattern,
-                    target_date
-                )
-                total_generated += generated
-                total_skipped += skipped
+            generated, skipped, _ = result
+            total_generated += generated
+            total_skipped += skipped
         
         return total_generated, total_skipped
     
-    def _calculate_end_time(self, start_time: time, duration_minutes: int) -> time:
-        """Вычислить время окончания занятия"""
-        start_datetime = datetime.combine(date.today(), start_time)
-        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
-        return end_datetime.time()
+    async def _generate_concurrently(
+        self,
+        patterns: List[RecurringPattern],
+        until_date: date
+    ) -> List[Union[Tuple[int, int, List[str]], BaseException]]:
+        """
+        Сгенерировать занятия для нескольких шаблонов параллельно
+        
+        Шаблоны группируются по кабинету. Внутри группы они обрабатываются
+        по очереди, каждый в своей сессии и транзакции: проверка конфликтов
+        следующего шаблона видит уже зафиксированные занятия предыдущего, и
+        два шаблона не займут один кабинет в одно время. Параллельно идут
+        только разные группы - у них нет общих кабинетов. Шаблоны без
+        кабинета конфликтов не имеют, каждый из них - отдельная группа.
+        
+        AsyncSession не допускает параллельных запросов, поэтому у каждой
+        группы своя сессия. Число одновременно обрабатываемых групп во всём
+        процессе ограничено _generation_semaphore, чтобы не исчерпать пул
+        соединений. Без session_factory все шаблоны обрабатываются
+        последовательно в текущей сессии.
+        
+        Даты последних занятий и ученики всех шаблонов загружаются заранее
+        одним запросом каждый, а не по запросу на шаблон.
+        
+        Args:
+            patterns: Шаблоны для генерации
+            until_date: До какой даты генерировать
+            
+        Returns:
+            Для каждого шаблона (в том же порядке) результат
+            генерации или возникшее исключение
+        """
+        pattern_ids = [pattern.id for pattern in patterns]
+        last_dates = await self.lesson_repo.get_last_dates_for_patterns(pattern_ids)
+        student_ids_by_pattern = await self.pattern_repo.get_student_ids_by_patterns(
+            pattern_ids
+        )
+        
+        if self.session_factory is None:
+            return await self._generate_sequentially(
+                patterns,
+                until_date,
+                last_dates,
+                student_ids_by_pattern
+            )
+        
+        groups: Dict[Tuple[str, int], List[RecurringPattern]] = {}
+        for pattern in patterns:
+            if pattern.classroom_id:
+                group_key = ("classroom", pattern.classroom_id)
+            else:
+                group_key = ("pattern", pattern.id)
+            groups.setdefault(group_key, []).append(pattern)
+        
+        results: Dict[int, Union[Tuple[int, int, List[str]], BaseException]] = {}
+        
+        async def generate_group(group: List[RecurringPattern]) -> None:
+            async with _generation_semaphore:
+                for pattern in group:
+                    try:
+                        results[pattern.id] = await generate_one(pattern)
+                    except Exception as e:
+                        results[pattern.id] = e
+        
+        async def generate_one(pattern: RecurringPattern) -> Tuple[int, int, List[str]]:
+            async with self.session_factory() as session:
+                # Одна явная транзакция на шаблон: все INSERT фиксируются одним
+                # COMMIT, при ошибке шаблон откатывается целиком
+                async with session.begin():
+                    generator = LessonGeneratorService(
+                        RecurringPatternRepository(session),
+                        LessonRepository(session)
+                    )
+                    result = await generator._generate_for_pattern(
+                        pattern,
+                        until_date,
+                        last_date=last_dates.get(pattern.id),
+                        student_ids=student_ids_by_pattern.get(pattern.id, [])
+                    )
+                # Транзакция зафиксирована - теперь можно сбросить кэш студии
+                await invalidate_changed_schedules(session)
+                return result
+        
+        await asyncio.gather(*(generate_group(group) for group in groups.values()))
+        
+        return [results[pattern.id] for pattern in patterns]
+    
+    async def _generate_sequentially(
+        self,
+        patterns: List[RecurringPattern],
+        until_date: date,
+        last_dates: Dict[int, date],
+        student_ids_by_pattern: Dict[int, List[int]]
+    ) -> List[Union[Tuple[int, int, List[str]], BaseException]]:
+        """
+        Сгенерировать занятия для шаблонов по очереди в текущей сессии
+        
+        Каждый шаблон генерируется в своём SAVEPOINT: ошибка одного шаблона
+        откатывает только его занятия и не ломает транзакцию остальных.
+        
+        Returns:
+            Для каждого шаблона (в том же порядке) результат
+            генерации или возникшее исключение
+        """
+        results = []
+        for pattern in patterns:
+            try:
+                async with self.lesson_repo.db.begin_nested():
+                    results.append(
+                        await self._generate_for_pattern(
+                            pattern,
+                            until_date,
+                            last_date=last_dates.get(pattern.id),
+                            student_ids=student_ids_by_pattern.get(pattern.id, [])
+                        )
+                    )
+            except Exception as e:
+                results.append(e)
+        return results
+    
+    @staticmethod
+    def _candidate_dates(
+        pattern: RecurringPattern,
+        until_date: date,
+        last_date: Optional[date] = None
+    ) -> List[date]:
+        """
+        Даты занятий шаблона, которые нужно сгенерировать
+        
+        Начинаем со следующей недели после last_date, а при первой генерации -
+        с первого подходящего дня недели начиная с valid_from.
+        Заканчиваем на min(until_date, valid_until).
+        """
+        if last_date:
+            start = last_date + timedelta(days=7)
+        else:
+            offset = (pattern.day_of_week - pattern.valid_from.isoweekday()) % 7
+            start = pattern.valid_from + timedelta(days=offset)
+        
+        end = until_date
+        if pattern.valid_until and pattern.valid_until < end:
+            end = pattern.valid_until
+        
+        if start > end:
+            return []
+        
+        return [start + timedelta(weeks=i) for i in range((end - start).days // 7 + 1)]
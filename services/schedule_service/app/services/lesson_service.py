@@ -4,11 +4,13 @@
 
 import logging
 from typing import List, Optional
-from datetime import date, time, datetime, timedelta
+from datetime import date, time
 
 from app.models.lesson import Lesson
 from app.repositories.lesson_repository import LessonRepository
 from app.schemas.lesson import LessonCreate, LessonUpdate
+from app.utils.time_utils import calculate_end_time
+from app.database.schedule_cache import mark_schedule_changed
 from app.core.exceptions import (
     LessonNotFoundException,
     ClassroomConflictException,
@@ -29,6 +31,16 @@ logger = logging.getLogger(__name__)
 class LessonService:
     """Сервис для работы с занятиями"""
     
+    __slots__ = ("lesson_repo", "db")
+    
+    # Допустимые переходы статусов (см. _validate_status_transition)
+    _ALLOWED_TRANSITIONS = {
+        "scheduled": frozenset({"completed", "cancelled", "missed"}),
+        "completed": frozenset({"missed"}),
+        "cancelled": frozenset({"scheduled"}),
+        "missed": frozenset(),
+    }
+    
     def __init__(self, lesson_repo: LessonRepository, db: AsyncSession):
         self.lesson_repo = lesson_repo
         self.db = db
@@ -40,7 +52,7 @@ class LessonService:
         Проверяет конфликты кабинета перед созданием
         """
         # Вычисляем end_time
-        end_time = self._calculate_end_time(data.start_time, data.duration_minutes)
+        end_time = calculate_end_time(data.start_time, data.duration_minutes)
         
         # Проверяем конфликт кабинета
         if data.classroom_id:
@@ -73,10 +85,10 @@ class LessonService:
         
         lesson = await self.lesson_repo.create(lesson)
         logger.info(f"Created lesson {lesson.id}")
+        mark_schedule_changed(self.db, lesson.studio_id)
         
-       # Добавляем учеников
-        for student_id in data.student_ids:
-            await self.lesson_repo.add_student(lesson.id, student_id)
+        # Добавляем учеников одним INSERT
+        await self.lesson_repo.add_students(lesson.id, data.student_ids)
         
         # Записываем событие в outbox.
         # Коммит произойдёт ниже по стеку (в endpoint через get_async_session) -
@@ -103,6 +115,13 @@ class LessonService:
             raise LessonNotFoundException(lesson_id)
         return lesson
     
+    async def get_lesson_teacher_id(self, lesson_id: int) -> int:
+        """Получить ID преподавателя занятия (для проверки доступа)"""
+        teacher_id = await self.lesson_repo.get_teacher_id(lesson_id)
+        if teacher_id is None:
+            raise LessonNotFoundException(lesson_id)
+        return teacher_id
+    
     async def update_lesson(self, lesson_id: int, data: LessonUpdate) -> Lesson:
         """
         Обновить занятие (редактирование расписания и метаданных).
@@ -127,11 +146,11 @@ class LessonService:
         new_start_time = data.start_time if data.start_time is not None else old_start_time
         
         if data.duration_minutes is not None:
-            new_end_time = self._calculate_end_time(new_start_time, data.duration_minutes)
+            new_end_time = calculate_end_time(new_start_time, data.duration_minutes)
         elif data.start_time is not None:
             # Сохраняем старую длительность при сдвиге времени
             old_duration = self._duration_minutes(old_start_time, old_end_time)
-            new_end_time = self._calculate_end_time(new_start_time, old_duration)
+            new_end_time = calculate_end_time(new_start_time, old_duration)
         else:
             new_end_time = old_end_time
         
@@ -169,6 +188,7 @@ class LessonService:
         
         lesson = await self.lesson_repo.update_obj(lesson)
         logger.info(f"Updated lesson {lesson_id}")
+        mark_schedule_changed(self.db, lesson.studio_id)
         
         # Если изменилось расписание - шлём событие lesson.rescheduled.
         # Изменение только кабинета или заметок не уведомляем.
@@ -198,20 +218,20 @@ class LessonService:
     
     async def cancel_lesson(self, lesson_id: int, reason: Optional[str] = None) -> Lesson:
         """Отменить занятие. Публикует событие lesson.cancelled."""
-        lesson = await self.get_lesson(lesson_id)
-        
-        if lesson.status == "cancelled":
-            return lesson
-        
-        lesson.status = "cancelled"
-        if reason:
-            lesson.cancellation_reason = reason
+        lesson = await self.lesson_repo.update_status(
+            lesson_id,
+            "cancelled",
+            cancellation_reason=reason
+        )
+        if lesson is None:
+            # Занятия нет (404) или оно уже отменено - событие не публикуем
+            return await self.get_lesson(lesson_id)
         
-        lesson = await self.lesson_repo.update_obj(lesson)
         logger.info(f"Cancelled lesson {lesson_id}")
+        mark_schedule_changed(self.db, lesson.studio_id)
         
-        # Получаем студентов до публикации события - они нужны для уведомлений
-        student_ids = await self.lesson_repo.get_student_ids(lesson_id)
+        # Ученики уже загружены вместе с занятием - они нужны для уведомлений
+        student_ids = [student.student_id for student in lesson.students]
         
         await record_lesson_cancelled(
             self.db,
@@ -228,21 +248,23 @@ class LessonService:
     
     async def complete_lesson(self, lesson_id: int) -> Lesson:
         """Отметить занятие как завершенное"""
-        lesson = await self.get_lesson(lesson_id)
+        lesson = await self.lesson_repo.update_status(lesson_id, "completed")
+        if lesson is None:
+            return await self.get_lesson(lesson_id)
         
-        lesson.status = "completed"
-        lesson = await self.lesson_repo.update_obj(lesson)
         logger.info(f"Completed lesson {lesson_id}")
+        mark_schedule_changed(self.db, lesson.studio_id)
         
         return lesson
     
     async def mark_as_missed(self, lesson_id: int) -> Lesson:
         """Отметить занятие как пропущенное"""
-        lesson = await self.get_lesson(lesson_id)
+        lesson = await self.lesson_repo.update_status(lesson_id, "missed")
+        if lesson is None:
+            return await self.get_lesson(lesson_id)
         
-        lesson.status = "missed"
-        lesson = await self.lesson_repo.update_obj(lesson)
         logger.info(f"Marked lesson {lesson_id} as missed")
+        mark_schedule_changed(self.db, lesson.studio_id)
         
         return lesson
     
@@ -254,6 +276,7 @@ class LessonService:
         
         if result:
             logger.info(f"Deleted lesson {lesson_id}")
+            mark_schedule_changed(self.db, lesson.studio_id)
         
         return result
     
@@ -305,12 +328,6 @@ class LessonService:
         """Получить список ID учеников занятия"""
         return await self.lesson_repo.get_student_ids(lesson_id)
     
-    def _calculate_end_time(self, start_time: time, duration_minutes: int) -> time:
-        """Вычислить время окончания занятия"""
-        start_datetime = datetime.combine(date.today(), start_time)
-        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
-        return end_datetime.time()
-    
     @staticmethod
     def _duration_minutes(start: time, end: time) -> int:
         """Длительность между двумя временами в минутах (без учёта суток)."""
@@ -327,12 +344,5 @@ class LessonService:
         - completed -> missed (если ученик не пришел)
         - cancelled -> scheduled (восстановление)
         """
-        allowed_transitions = {
-            "scheduled": ["completed", "cancelled", "missed"],
-            "completed": ["missed"],
-            "cancelled": ["scheduled"],
-            "missed": []
-        }
-        
-        if new_status not in allowed_transitions.get(current_status, []):
+        if new_status not in self._ALLOWED_TRANSITIONS.get(current_status, frozenset()):
             raise InvalidLessonStatusException(current_status, new_status)
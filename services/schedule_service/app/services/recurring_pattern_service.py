@@ -3,7 +3,7 @@
 """
 
 import logging
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import date, timedelta
 
 from app.models.recurring_pattern import RecurringPattern
@@ -11,6 +11,7 @@ from app.repositories.recurring_pattern_repository import RecurringPatternReposi
 from app.repositories.lesson_repository import LessonRepository
 from app.schemas.recurring_pattern import RecurringPatternCreate, RecurringPatternUpdate
 from app.core.exceptions import RecurringPatternNotFoundException
+from app.database.schedule_cache import mark_schedule_changed
 from app.services.lesson_generator_service import LessonGeneratorService
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,8 @@ logger = logging.getLogger(__name__)
 class RecurringPatternService:
     """Сервис для работы с шаблонами повторяющихся занятий"""
     
+    __slots__ = ("pattern_repo", "lesson_repo", "generator_service")
+    
     def __init__(
         self,
         pattern_repo: RecurringPatternRepository,
@@ -56,9 +59,8 @@ class RecurringPatternService:
         pattern = await self.pattern_repo.create(pattern)
         logger.info(f"Created recurring pattern {pattern.id}")
         
-        # Добавляем учеников
-        for student_id in data.student_ids:
-            await self.pattern_repo.add_student(pattern.id, student_id)
+        # Добавляем учеников одним INSERT
+        await self.pattern_repo.add_students(pattern.id, data.student_ids)
         
         # Генерируем занятия на ближайшие недели
         until_date = date.today() + timedelta(weeks=2)
@@ -71,6 +73,8 @@ class RecurringPatternService:
             logger.warning(f"Errors during generation for pattern {pattern.id}: {errors}")
         
         logger.info(f"Generated {generated} lessons for pattern {pattern.id}")
+        # Дальше schedule_generation_weeks шаблон догенерирует проверка при чтении
+        mark_schedule_changed(self.pattern_repo.db, pattern.studio_id, regenerate=True)
         
         return pattern, generated
     
@@ -81,6 +85,13 @@ class RecurringPatternService:
             raise RecurringPatternNotFoundException(pattern_id)
         return pattern
     
+    async def get_pattern_teacher_id(self, pattern_id: int) -> int:
+        """Получить ID преподавателя шаблона (для проверки доступа)"""
+        teacher_id = await self.pattern_repo.get_teacher_id(pattern_id)
+        if teacher_id is None:
+            raise RecurringPatternNotFoundException(pattern_id)
+        return teacher_id
+    
     async def get_patterns_by_studio(
         self,
         studio_id: int,
@@ -125,6 +136,8 @@ class RecurringPatternService:
         
         pattern = await self.pattern_repo.update_obj(pattern)
         logger.info(f"Updated recurring pattern {pattern_id}")
+        # Шаблон мог стать активным или продлиться - генерацию нужно проверить заново
+        mark_schedule_changed(self.pattern_repo.db, pattern.studio_id, regenerate=True)
         
         return pattern
     
@@ -134,18 +147,23 @@ class RecurringPatternService:
         
         Примечание: Связанные занятия не удаляются (recurring_pattern_id просто станет NULL)
         """
-        pattern = await self.get_pattern(pattern_id)
-        
-        result = await self.pattern_repo.delete_by_id(pattern_id)
+        # Отсутствие шаблона определяем по результату DELETE, без отдельного SELECT
+        studio_id = await self.pattern_repo.delete_returning_studio_id(pattern_id)
+        if studio_id is None:
+            raise RecurringPatternNotFoundException(pattern_id)
         
-        if result:
-            logger.info(f"Deleted recurring pattern {pattern_id}")
+        logger.info(f"Deleted recurring pattern {pattern_id}")
+        # Занятия шаблона в расписании перестают быть повторяющимися
+        mark_schedule_changed(self.pattern_repo.db, studio_id)
         
-        return result
+        return True
     
     async def deactivate_pattern(self, pattern_id: int) -> RecurringPattern:
         """Деактивировать шаблон (мягкое удаление)"""
-        pattern = await self.get_pattern(pattern_id)
+        # Ученики здесь не нужны - загружаем шаблон без них
+        pattern = await self.pattern_repo.get_by_id(pattern_id)
+        if not pattern:
+            raise RecurringPatternNotFoundException(pattern_id)
         pattern.is_active = False
         
         pattern = await self.pattern_repo.update_obj(pattern)
@@ -159,5 +177,12 @@ class RecurringPatternService:
     
     async def count_generated_lessons(self, pattern_id: int) -> int:
         """Подсчитать количество занятий, сгенерированных из шаблона"""
-        lessons = await self.lesson_repo.get_by_pattern(pattern_id)
-        return len(lessons)
+        return await self.lesson_repo.count_by_pattern(pattern_id)
+    
+    async def get_patterns_student_ids(self, pattern_ids: List[int]) -> Dict[int, List[int]]:
+        """Получить ID учеников нескольких шаблонов одним запросом"""
+        return await self.pattern_repo.get_student_ids_by_patterns(pattern_ids)
+    
+    async def count_generated_lessons_bulk(self, pattern_ids: List[int]) -> Dict[int, int]:
+        """Подсчитать сгенерированные занятия нескольких шаблонов одним запросом"""
+        return await self.lesson_repo.count_by_patterns(pattern_ids)
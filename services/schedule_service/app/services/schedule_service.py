@@ -2,18 +2,28 @@
 Сервис для работы с расписанием (просмотр и фильтрация)
 """
 
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import date
 
+from app.config import settings
+from app.database.redis_client import redis_client
+from app.database.schedule_cache import invalidate_changed_schedules
 from app.models.lesson import Lesson
+from app.models.user_cache import UserCache
 from app.repositories.lesson_repository import LessonRepository
 from app.repositories.user_repository import UserRepository
 from app.services.lesson_generator_service import LessonGeneratorService
 from app.schemas.schedule import ScheduleLessonItem
+from app.utils.cache_keys import cache_keys
 
 logger = logging.getLogger(__name__)
 
+# Блокировки проверки генерации по студиям (на процесс): параллельные запросы
+# расписания одной студии выполняют проверку один раз
+_generation_locks: Dict[int, asyncio.Lock] = {}
+
 
 class ScheduleService:
     """Сервис для работы с расписанием"""
@@ -37,22 +47,67 @@ class ScheduleService:
         """
         Получить расписание студии за период
         
-        Автоматически догенерирует занятия если нужно
+        Автоматически догенерирует занятия если нужно. Результат кэшируется
+        в Redis на schedule_cache_ttl секунд под текущей версией расписания
+        студии; изменение её занятий увеличивает версию.
         """
         # Проверяем и генерируем занятия если нужно
-        await self.generator_service.check_and_generate_if_needed(studio_id)
+        await self._ensure_lessons_generated(studio_id)
+        
+        version = await redis_client.get(cache_keys.studio_schedule_version(studio_id)) or 0
+        cache_key = cache_keys.studio_schedule(studio_id, version, from_date, to_date)
+        cached = await redis_client.get(cache_key)
+        if cached is not None:
+            return [ScheduleLessonItem.model_validate(item) for item in cached]
         
         # Получаем занятия
         lessons = await self.lesson_repo.get_by_studio(studio_id, from_date, to_date)
         
         # Преобразуем в ScheduleLessonItem
-        schedule_items = []
-        for lesson in lessons:
-            item = await self._lesson_to_schedule_item(lesson)
-            schedule_items.append(item)
+        schedule_items = await self._build_schedule_items(lessons)
+        
+        await redis_client.set(
+            cache_key,
+            [item.model_dump(mode="json") for item in schedule_items],
+            ttl=settings.schedule_cache_ttl
+        )
         
         return schedule_items
     
+    async def _ensure_lessons_generated(self, studio_id: int) -> None:
+        """
+        Догенерировать занятия студии не чаще раза в schedule_generation_check_ttl
+        
+        Успешная проверка отмечается в Redis ключом schedule_gen_ok:{studio_id};
+        пока он жив, проверка пропускается во всех воркерах. Внутри процесса
+        одновременные запросы по одной студии ждут одну проверку на блокировке,
+        между воркерами генерацию сериализует advisory-блокировка в БД.
+        Сгенерированные занятия фиксируются до отметки и до снятия блокировки:
+        если COMMIT не удался, отметки нет и следующий запрос повторит проверку.
+        Без Redis проверка выполняется на каждый запрос, как раньше.
+        """
+        sentinel_key = cache_keys.generation_checked(studio_id)
+        if await redis_client.exists(sentinel_key):
+            return
+        
+        lock = _generation_locks.setdefault(studio_id, asyncio.Lock())
+        async with lock:
+            # Пока ждали блокировку, проверку мог выполнить другой запрос
+            if await redis_client.exists(sentinel_key):
+                return
+            
+            await self.generator_service.check_and_generate_if_needed(studio_id)
+            
+            session = self.lesson_repo.db
+            await session.commit()
+            await invalidate_changed_schedules(session)
+            
+            await redis_client.set(
+                sentinel_key,
+                1,
+                ttl=settings.schedule_generation_check_ttl
+            )
+    
     async def get_teacher_schedule(
         self,
         teacher_id: int,
@@ -62,12 +117,7 @@ class ScheduleService:
         """Получить расписание преподавателя за период"""
         lessons = await self.lesson_repo.get_by_teacher(teacher_id, from_date, to_date)
         
-        schedule_items = []
-        for lesson in lessons:
-            item = await self._lesson_to_schedule_item(lesson)
-            schedule_items.append(item)
-        
-        return schedule_items
+        return await self._build_schedule_items(lessons)
     
     async def get_student_schedule(
         self,
@@ -78,25 +128,60 @@ class ScheduleService:
         """Получить занятия ученика за период"""
         lessons = await self.lesson_repo.get_by_student(student_id, from_date, to_date)
         
-        schedule_items = []
-        for lesson in lessons:
-            item = await self._lesson_to_schedule_item(lesson)
-            schedule_items.append(item)
+        return await self._build_schedule_items(lessons)
+    
+    async def _build_schedule_items(self, lessons: List[Lesson]) -> List[ScheduleLessonItem]:
+        """
+        Преобразовать занятия в ScheduleLessonItem
         
-        return schedule_items
+        Ученики всех занятий и все нужные пользователи (преподаватели и
+        ученики) загружаются двумя запросами на весь список, а не по
+        запросу на каждое занятие.
+        """
+        student_ids_by_lesson = await self.lesson_repo.get_student_ids_bulk(
+            [lesson.id for lesson in lessons]
+        )
+        
+        all_user_ids = {lesson.teacher_id for lesson in lessons}
+        for student_ids in student_ids_by_lesson.values():
+            all_user_ids.update(student_ids)
+        
+        users = await self.user_repo.get_by_ids(list(all_user_ids)) if all_user_ids else []
+        users_dict = {user.id: user for user in users}
+        
+        return [
+            self._lesson_to_schedule_item(
+                lesson,
+                student_ids_by_lesson.get(lesson.id, []),
+                users_dict
+            )
+            for lesson in lessons
+        ]
     
-    async def _lesson_to_schedule_item(self, lesson: Lesson) -> ScheduleLessonItem:
+    def _lesson_to_schedule_item(
+        self,
+        lesson: Lesson,
+        student_ids: List[int],
+        users_dict: Dict[int, UserCache]
+    ) -> ScheduleLessonItem:
         """
         Преобразовать Lesson в ScheduleLessonItem с дополнительной информацией
+        
+        Args:
+            lesson: Занятие
+            student_ids: Ученики занятия
+            users_dict: Уже загруженные пользователи {user_id: UserCache}
         """
-        # Получаем информацию о преподавателе
-        teacher = await self.user_repo.get_by_id(lesson.teacher_id)
+        # Информация о преподавателе
+        teacher = users_dict.get(lesson.teacher_id)
         teacher_name = self.user_repo.get_full_name(teacher) if teacher else "Unknown"
         
-        # Получаем учеников
-        student_ids = await self.lesson_repo.get_student_ids(lesson.id)
-        students = await self.user_repo.get_by_ids(student_ids) if student_ids else []
-        student_names = [self.user_repo.get_full_name(s) for s in students]
+        # Ученики
+        student_names = [
+            self.user_repo.get_full_name(users_dict[student_id])
+            for student_id in student_ids
+            if student_id in users_dict
+        ]
         
         # TODO: Получить информацию о кабинете из Admin Service
         classroom_name = f"Кабинет {lesson.classroom_id}" if lesson.classroom_id else None
@@ -134,9 +219,13 @@ class ScheduleService:
         if include_teacher_info:
             all_user_ids.update([lesson.teacher_id for lesson in lessons])
         
+        # Учеников всех занятий загружаем одним запросом и используем дважды
+        student_ids_by_lesson: Dict[int, List[int]] = {}
         if include_student_info:
-            for lesson in lessons:
-                student_ids = await self.lesson_repo.get_student_ids(lesson.id)
+            student_ids_by_lesson = await self.lesson_repo.get_student_ids_bulk(
+                [lesson.id for lesson in lessons]
+            )
+            for student_ids in student_ids_by_lesson.values():
                 all_user_ids.update(student_ids)
         
         # Загружаем всех пользователей одним запросом
@@ -167,7 +256,7 @@ class ScheduleService:
             
             # Добавляем информацию об учениках
             if include_student_info:
-                student_ids = await self.lesson_repo.get_student_ids(lesson.id)
+                student_ids = student_ids_by_lesson.get(lesson.id, [])
                 students_info = []
                 for sid in student_ids:
                     if sid in users_dict:
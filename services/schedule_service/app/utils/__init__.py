@@ -0,0 +1,12 @@
+"""
+Утилиты для Schedule Service
+"""
+
+from app.utils.time_utils import calculate_end_time
+from app.utils.cache_keys import cache_keys, CacheKeys
+
+__all__ = [
+    "calculate_end_time",
+    "cache_keys",
+    "CacheKeys"
+]
@@ -0,0 +1,46 @@
+"""
+Утилиты для генерации ключей кэша
+Централизованное управление ключами для консистентности
+"""
+
+from datetime import date
+
+
+class CacheKeys:
+    """Генератор ключей кэша для Schedule Service"""
+    
+    # Префиксы для разных типов данных
+    SCHEDULE_PREFIX = "schedule"
+    GENERATION_PREFIX = "schedule_gen_ok"
+    
+    @staticmethod
+    def studio_schedule(
+        studio_id: int,
+        version: int,
+        from_date: date,
+        to_date: date
+    ) -> str:
+        """
+        Ключ для расписания студии за период
+        
+        В ключ входит версия расписания студии: после изменения занятий
+        версия растёт, и старые ключи больше не читаются (истекают по TTL).
+        """
+        return (
+            f"{CacheKeys.SCHEDULE_PREFIX}:studio:{studio_id}:v{version}:"
+            f"{from_date.isoformat()}:{to_date.isoformat()}"
+        )
+    
+    @staticmethod
+    def studio_schedule_version(studio_id: int) -> str:
+        """Ключ счётчика версии расписания студии"""
+        return f"{CacheKeys.SCHEDULE_PREFIX}:studio:{studio_id}:version"
+    
+    @staticmethod
+    def generation_checked(studio_id: int) -> str:
+        """Ключ-отметка о недавней проверке генерации занятий студии"""
+        return f"{CacheKeys.GENERATION_PREFIX}:{studio_id}"
+
+
+# Глобальный экземпляр
+cache_keys = CacheKeys()
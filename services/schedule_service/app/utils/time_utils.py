@@ -0,0 +1,22 @@
+"""
+Утилиты для работы со временем занятий
+"""
+
+from datetime import time
+
+
+def calculate_end_time(start_time: time, duration_minutes: int) -> time:
+    """
+    Вычислить время окончания занятия
+    
+    Считается в минутах без промежуточных datetime; переход через
+    полночь заворачивается по модулю суток, как и раньше.
+    """
+    total = start_time.hour * 60 + start_time.minute + duration_minutes
+    hours, minutes = divmod(total, 60)
+    return time(
+        hour=hours % 24,
+        minute=minutes,
+        second=start_time.second,
+        microsecond=start_time.microsecond
+    )
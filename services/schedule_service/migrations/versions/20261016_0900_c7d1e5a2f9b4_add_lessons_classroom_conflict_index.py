@@ -0,0 +1,58 @@
+"""add partial index for classroom conflict checks
+
+Заменяет idx_classroom_datetime: все запросы по кабинету исключают
+отменённые занятия и обслуживаются частичным индексом.
+
+Revision ID: c7d1e5a2f9b4
+Revises: 4f2e8a91b3d7
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1e5a2f9b4'
+down_revision = '4f2e8a91b3d7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY нельзя выполнять внутри транзакции - выходим в autocommit,
+    # чтобы не блокировать запись в lessons на время построения индекса
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_lessons_classroom_date_time',
+            'lessons',
+            ['classroom_id', 'lesson_date', 'start_time', 'end_time'],
+            unique=False,
+            postgresql_where=sa.text("status != 'cancelled'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'idx_classroom_datetime',
+            table_name='lessons',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_classroom_datetime',
+            'lessons',
+            ['classroom_id', 'lesson_date', 'start_time'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'idx_lessons_classroom_date_time',
+            table_name='lessons',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
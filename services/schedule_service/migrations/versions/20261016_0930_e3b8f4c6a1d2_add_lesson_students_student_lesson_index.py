@@ -0,0 +1,55 @@
+"""add (student_id, lesson_id) index on lesson_students
+
+Заменяет ix_lesson_students_student_id: новый индекс начинается с
+student_id и обслуживает те же запросы.
+
+Revision ID: e3b8f4c6a1d2
+Revises: c7d1e5a2f9b4
+Create Date: 2026-10-16 09:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b8f4c6a1d2'
+down_revision = 'c7d1e5a2f9b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_lesson_students_student_lesson',
+            'lesson_students',
+            ['student_id', 'lesson_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_lesson_students_student_id',
+            table_name='lesson_students',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_lesson_students_student_id',
+            'lesson_students',
+            ['student_id'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'idx_lesson_students_student_lesson',
+            table_name='lesson_students',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,38 @@
+"""add (recurring_pattern_id, lesson_date) index on lessons
+
+Revision ID: 9a4c2d7e5b13
+Revises: e3b8f4c6a1d2
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c2d7e5b13'
+down_revision = 'e3b8f4c6a1d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY нельзя выполнять внутри транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_lessons_pattern_date',
+            'lessons',
+            ['recurring_pattern_id', 'lesson_date'],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_lessons_pattern_date',
+            table_name='lessons',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
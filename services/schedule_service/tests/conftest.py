@@ -0,0 +1,50 @@
+"""Pytest configuration and fixtures"""
+import pytest
+from typing import AsyncGenerator
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.models import Base
+
+# Test database URL
+TEST_DATABASE_URL = settings.database_url_async.replace(
+    settings.database_name,
+    f"{settings.database_name}_test"
+)
+
+
+@pytest.fixture(scope="function")
+async def engine() -> AsyncGenerator[AsyncEngine, None]:
+    """Create test database schema"""
+    engine = create_async_engine(TEST_DATABASE_URL, echo=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    yield engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+    await engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def session_factory(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    """Session factory bound to the test database"""
+    return async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False,
+    )
+
+
+@pytest.fixture(scope="function")
+async def db_session(
+    session_factory: async_sessionmaker[AsyncSession]
+) -> AsyncGenerator[AsyncSession, None]:
+    """Create test database session"""
+    async with session_factory() as session:
+        yield session
+        await session.rollback()
@@ -0,0 +1,94 @@
+"""Tests for lesson generation from recurring patterns"""
+import pytest
+from datetime import date, time, timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.lesson import Lesson
+from app.models.recurring_pattern import RecurringPattern
+from app.repositories.lesson_repository import LessonRepository
+from app.repositories.recurring_pattern_repository import RecurringPatternRepository
+from app.services.lesson_generator_service import LessonGeneratorService
+
+
+def make_pattern(
+    teacher_id: int,
+    classroom_id: int,
+    start_time: time,
+    duration_minutes: int = 60
+) -> RecurringPattern:
+    """Weekly pattern that is already active today"""
+    return RecurringPattern(
+        studio_id=1,
+        teacher_id=teacher_id,
+        classroom_id=classroom_id,
+        day_of_week=date.today().isoweekday(),
+        start_time=start_time,
+        duration_minutes=duration_minutes,
+        valid_from=date.today() - timedelta(days=1),
+        is_active=True,
+    )
+
+
+def make_generator(
+    db_session: AsyncSession,
+    session_factory: async_sessionmaker[AsyncSession]
+) -> LessonGeneratorService:
+    return LessonGeneratorService(
+        RecurringPatternRepository(db_session),
+        LessonRepository(db_session),
+        session_factory
+    )
+
+
+@pytest.mark.asyncio
+async def test_generate_all_patterns_does_not_double_book_classroom(
+    db_session: AsyncSession,
+    session_factory: async_sessionmaker[AsyncSession]
+):
+    """Overlapping patterns in one classroom must not both get lessons"""
+    first = make_pattern(teacher_id=10, classroom_id=5, start_time=time(10, 0))
+    second = make_pattern(teacher_id=20, classroom_id=5, start_time=time(10, 30))
+    db_session.add_all([first, second])
+    await db_session.commit()
+
+    until_date = date.today() + timedelta(weeks=4)
+    expected_dates = LessonGeneratorService._candidate_dates(first, until_date)
+
+    generator = make_generator(db_session, session_factory)
+    generated, skipped, errors = await generator.generate_all_patterns(until_date)
+
+    assert generated == len(expected_dates)
+    assert skipped == len(expected_dates)
+    assert len(errors) == len(expected_dates)
+
+    result = await db_session.execute(
+        select(Lesson.lesson_date, Lesson.recurring_pattern_id)
+        .where(Lesson.classroom_id == 5)
+    )
+    rows = result.all()
+    booked_dates = [lesson_date for lesson_date, _ in rows]
+    assert sorted(booked_dates) == sorted(expected_dates)
+    assert len({pattern_id for _, pattern_id in rows}) == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_all_patterns_different_classrooms(
+    db_session: AsyncSession,
+    session_factory: async_sessionmaker[AsyncSession]
+):
+    """Patterns in different classrooms are generated independently"""
+    first = make_pattern(teacher_id=10, classroom_id=5, start_time=time(10, 0))
+    second = make_pattern(teacher_id=20, classroom_id=6, start_time=time(10, 0))
+    db_session.add_all([first, second])
+    await db_session.commit()
+
+    until_date = date.today() + timedelta(weeks=4)
+    expected_dates = LessonGeneratorService._candidate_dates(first, until_date)
+
+    generator = make_generator(db_session, session_factory)
+    generated, skipped, errors = await generator.generate_all_patterns(until_date)
+
+    assert generated == 2 * len(expected_dates)
+    assert skipped == 0
+    assert errors == []